@@ -1,5 +1,6 @@
 # src/email_handler.py
 import os
+import gzip
 import mimetypes
 import boto3
 from botocore.exceptions import ClientError
@@ -8,24 +9,52 @@ from email.mime.text import MIMEText
 from email.mime.base import MIMEBase
 from email.mime.image import MIMEImage
 from email import encoders
+from functools import lru_cache
 
+# Text attachments (the metrics CSV) larger than this are sent gzipped
+GZIP_ATTACHMENT_MIN_BYTES = 1024 * 1024
 
-def send_email(
+
+@lru_cache(maxsize=None)
+def _ses_client(region):
+    """Return an SES client for region, created once per process and reused."""
+    return boto3.client("ses", region_name=region)
+
+
+def _attachment_type(path):
+    """Return the (maintype, subtype) a file is attached as, before any gzipping."""
+    ctype, enc = mimetypes.guess_type(path)
+    if ctype is None or enc is not None:
+        ctype = "application/octet-stream"
+    return tuple(ctype.split("/", 1))
+
+
+def _gzips_attachment(maintype, size):
+    # repetitive text compresses 5-10x, which shrinks the base64 pass and the SES payload
+    return maintype == "text" and size > GZIP_ATTACHMENT_MIN_BYTES
+
+
+def attachment_filename(path, size):
+    """Return the filename path is attached under: with .gz added if send_email gzips it."""
+    filename = os.path.basename(path)
+    maintype, _ = _attachment_type(path)
+    return filename + ".gz" if _gzips_attachment(maintype, size) else filename
+
+
+def build_message(
     sender,
     recipient,
     subject,
     body_text,
     body_html=None,
     attachment_paths=None,
-    inline_images=None,  # [{"cid": "chart1@etl", "path": "/abs/path.jpg"}, ...]
+    inline_images=None,
 ):
     """
-    Send an email via AWS SES with optional HTML, file attachments,
-    and inline CID images (for Gmail/Outlook/Apple Mail).
+    Build the MIME message send_email sends: text/HTML alternatives, inline
+    CID images and file attachments. Arguments are as for send_email.
     """
     CHARSET = "utf-8"
-    AWS_REGION = os.environ.get("AWS_DEFAULT_REGION", "us-west-2")
-    client = boto3.client("ses", region_name=AWS_REGION)
 
     # OUTER: mixed (attachments live here)
     msg = MIMEMultipart("mixed")
@@ -52,7 +81,7 @@ def send_email(
 
         # inline images with matching Content-ID
         for item in (inline_images or []):
-            cid = item["cid"]                    # e.g. "chart1@etl"
+            cid = item["cid"]                    # e.g. "market_overview@etl"
             path = item["path"]
 
             with open(path, "rb") as f:
@@ -79,17 +108,39 @@ def send_email(
         if not p or not os.path.exists(p):
             print(f"⚠️ Attachment not found: {p}")
             continue
-        ctype, enc = mimetypes.guess_type(p)
-        if ctype is None or enc is not None:
-            ctype = "application/octet-stream"
-        maintype, subtype = ctype.split("/", 1)
+        maintype, subtype = _attachment_type(p)
         with open(p, "rb") as f:
-            part = MIMEBase(maintype, subtype)
-            part.set_payload(f.read())
+            data = f.read()
+        filename = attachment_filename(p, len(data))
+        if _gzips_attachment(maintype, len(data)):
+            data = gzip.compress(data, compresslevel=1)
+            maintype, subtype = "application", "gzip"
+        part = MIMEBase(maintype, subtype)
+        part.set_payload(data)
         encoders.encode_base64(part)
-        part.add_header("Content-Disposition", "attachment", filename=os.path.basename(p))
+        part.add_header("Content-Disposition", "attachment", filename=filename)
         msg.attach(part)
-        print(f"✅ Attachment added: {p} ({os.path.getsize(p)} bytes)")
+        print(f"✅ Attachment added: {filename} ({len(data)} bytes)")
+
+    return msg
+
+
+def send_email(
+    sender,
+    recipient,
+    subject,
+    body_text,
+    body_html=None,
+    attachment_paths=None,
+    inline_images=None,  # [{"cid": "market_overview@etl", "path": "/abs/path.jpg"}, ...]
+):
+    """
+    Send an email via AWS SES with optional HTML, file attachments,
+    and inline CID images (for Gmail/Outlook/Apple Mail).
+    """
+    AWS_REGION = os.environ.get("AWS_DEFAULT_REGION", "us-west-2")
+    client = _ses_client(AWS_REGION)
+    msg = build_message(sender, recipient, subject, body_text, body_html, attachment_paths, inline_images)
 
     # Send as RAW bytes
     try:
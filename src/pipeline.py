@@ -1,68 +1,226 @@
 import os
-import io
-import itertools
 import duckdb
 import pandas as pd
+import pyarrow as pa
 import yfinance as yf
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 
 # ---- Config from environment ----
 TICKERS = os.getenv("TICKERS", "SPY,QQQ,AAPL,GOOGL,NVDA,AMZN").split(",")
 DB_PATH = "data/market.duckdb"
 EXPORT_CSV = "data/daily_metrics.csv"
+EXPORT_PARQUET = "data/daily_metrics.parquet"  # typed copy for the chart side
+EXPORT_RAW_CSV = "data/raw_prices_export.csv"
 LOOKBACK_DAYS = int(os.getenv("LOOKBACK_DAYS", "400"))  # historical backfill
 RSI_PERIOD = int(os.getenv("RSI_PERIOD", "14"))
 
 os.makedirs("data", exist_ok=True)
 
 
-def fetch_prices(tickers, period_days) -> pd.DataFrame:
+def fetch_prices(tickers, period_days, last_dates=None) -> pd.DataFrame:
     """
     Fetch daily adjusted OHLCV data for the given tickers over the specified period.
+
+    Tickers that already have stored history are only fetched from their last
+    stored date onwards, so a rerun downloads a handful of rows instead of the
+    whole lookback window. Each ticker is a separate request, issued in
+    parallel from a thread pool; a ticker that fails is skipped with a warning
+    instead of failing the whole batch.
+
     Args:
         tickers (list): List of ticker symbols to fetch data for.
         period_days (int): Number of days to look back from today.
+        last_dates (dict, optional): Date to start each ticker from, normally its
+            last stored date as returned by latest_price_dates (an earlier date
+            refetches stored history). Tickers missing from it get the full lookback.
 
     Returns:
-        pd.DataFrame: DataFrame containing date, ticker, open, high, low, close, volume.
+        pd.DataFrame: DataFrame containing date, ticker, open, high, low, close, volume,
+            plus the dividends and splits paid on each day.
     """
-    # Fetch daily adjusted OHLCV for the last N days
-    start = (
-        (datetime.now(timezone.utc) - timedelta(days=period_days)).date().isoformat()
-    )
+    today = datetime.now(timezone.utc).date()
+    default_start = today - timedelta(days=period_days)
+    last_dates = last_dates or {}
+
+    # the last stored day is refetched to pick up revisions
     # .strip() to handle any extra spaces in ticker list
-    df = yf.download(
-        tickers=[t.strip() for t in tickers],
-        start=start,
-        interval="1d",
-        group_by="ticker",
-        threads=True,
-        progress=False,
-    )
-    # Normalize to long format: date, ticker, open, high, low, close, volume
-    frames = []
-    if isinstance(df.columns, pd.MultiIndex):
-        for t in tickers:
-            if t.strip() not in df.columns.levels[0]:
-                continue
-            sub = df[t.strip()].reset_index()
-            sub = sub.rename(columns=lambda x: x.lower())
-            sub["ticker"] = t.strip()
-            frames.append(sub)
-    else:
-        # Single ticker returns flat columns
-        sub = df.reset_index()
-        sub = sub.rename(columns=lambda x: x.lower())
-        sub["ticker"] = tickers[0].strip()
-        frames.append(sub)
+    starts = {}
+    for t in (t.strip() for t in tickers):
+        last = last_dates.get(t)
+        if last is not None and last >= today:
+            continue
+        starts[t] = last or default_start
+    if not starts:
+        return pd.DataFrame()
+
+    # network-bound: one request per ticker, up to 16 in flight
+    with ThreadPoolExecutor(max_workers=min(16, len(starts))) as ex:
+        frames = list(ex.map(_download_prices, starts, starts.values()))
+    frames = [f for f in frames if not f.empty]
     if not frames:
         return pd.DataFrame()
-    out = pd.concat(frames, ignore_index=True)
-    out = out.rename(columns={"index": "date"})
+    return pd.concat(frames, ignore_index=True).sort_values(["ticker", "date"])
+
+
+def _download_prices(ticker, start) -> pd.DataFrame:
+    """
+    Download daily OHLCV for one ticker from start and normalize to long format.
+
+    Args:
+        ticker (str): Stripped ticker symbol.
+        start (datetime.date): First date to download.
+
+    Returns:
+        pd.DataFrame: DataFrame containing date, ticker, open, high, low, close, volume,
+            dividends, splits. Empty if the download failed or returned no rows.
+    """
+    try:
+        df = yf.Ticker(ticker).history(start=start.isoformat(), interval="1d")
+    except Exception as e:
+        print(f"⚠️ Failed to fetch {ticker}: {e}")
+        return pd.DataFrame()
+    if df.empty:
+        return pd.DataFrame()
+    # Normalize to long format: date, ticker, open, high, low, close, volume
+    out = df.reset_index()
+    out = out.rename(columns=lambda x: x.lower())
     out = out.dropna(subset=["close"])
-    out["date"] = pd.to_datetime(out["date"]).dt.tz_localize("UTC").dt.date
-    cols = ["date", "ticker", "open", "high", "low", "close", "volume"]
-    return out[cols].sort_values(["ticker", "date"])
+    out["ticker"] = ticker
+    # history() stamps bars at midnight exchange time; keep that calendar date.
+    # It stays datetime64 (not Python date objects) so Arrow converts it
+    # natively and upsert_raw_prices casts it to DATE in one pass
+    dates = pd.to_datetime(out["date"])
+    if dates.dt.tz is not None:
+        dates = dates.dt.tz_localize(None)
+    out["date"] = dates.dt.normalize()
+    # prices are stored as REAL: float32 keeps ~7 significant digits, plenty
+    # for daily bars, and halves what every window query has to scan. Volume
+    # is a share count, stored as BIGINT (float32 would round counts above ~16.7M)
+    price_cols = ["open", "high", "low", "close"]
+    out[price_cols] = out[price_cols].astype("float32")
+    out["volume"] = out["volume"].round().astype("Int64")
+    # corporate actions aren't stored, but readjusted_tickers needs them: prices
+    # are adjusted, so a split or dividend rewrites every earlier close
+    out = out.rename(columns={"stock splits": "splits"})
+    for col in ("dividends", "splits"):
+        if col not in out.columns:
+            out[col] = 0.0
+    cols = ["date", "ticker", "open", "high", "low", "close", "volume", "dividends", "splits"]
+    return out[cols]
+
+
+def readjusted_tickers(con, prices, last_dates):
+    """
+    Return the tickers whose stored history no longer matches the provider's.
+
+    yfinance prices are split- and dividend-adjusted: when either goes ex, every
+    earlier close is rescaled. Rows fetched before and after that day don't line
+    up, so appending the new rows would leave a false jump at the boundary.
+    A ticker is flagged if its refetched overlap day changed (revised_closes)
+    or a split or dividend fell after its last stored date.
+
+    Args:
+        con (duckdb.DuckDBPyConnection): DuckDB connection object.
+        prices (pd.DataFrame): Prices as returned by fetch_prices.
+        last_dates (dict): Last stored date per ticker, as passed to fetch_prices.
+
+    Returns:
+        list: Sorted ticker symbols whose full history has to be refetched.
+    """
+    if prices.empty:
+        return []
+    flagged = set(revised_closes(con, prices)["ticker"])
+    last = pd.to_datetime(prices["ticker"].map(last_dates))
+    actions = (prices["dividends"] != 0) | (prices["splits"] != 0)
+    flagged.update(prices.loc[actions & (prices["date"] > last), "ticker"])
+    return sorted(flagged)
+
+
+def fetch_updates(con, tickers, period_days):
+    """
+    Fetch new prices for tickers, refetching the whole history of any ticker
+    whose adjusted history changed since it was stored.
+
+    Args:
+        con (duckdb.DuckDBPyConnection): DuckDB connection object.
+        tickers (list): List of ticker symbols to fetch data for.
+        period_days (int): Number of days to look back from today.
+
+    Returns:
+        tuple: The prices to upsert, and the tickers whose stored history has to
+            be dropped first (delete_ticker_history) because prices holds their
+            whole re-adjusted history.
+    """
+    last_dates = latest_price_dates(con)
+    prices = fetch_prices(tickers, period_days, last_dates)
+    readjusted = readjusted_tickers(con, prices, last_dates)
+    if not readjusted:
+        return prices, []
+
+    print(f"⚠️ Adjusted history changed for {', '.join(readjusted)}, refetching full history...")
+    # from the earliest stored day (or the lookback start, if earlier), so the
+    # delete that follows replaces the stored history instead of shortening it
+    lookback_start = datetime.now(timezone.utc).date() - timedelta(days=period_days)
+    first_dates = earliest_price_dates(con)
+    starts = {t: min(first_dates.get(t, lookback_start), lookback_start) for t in readjusted}
+    full = fetch_prices(readjusted, period_days, starts)
+    # a ticker whose refetch failed is left out of this run rather than mixing
+    # differently adjusted rows; its overlap day is flagged again next run
+    kept = prices[~prices["ticker"].isin(readjusted)]
+    if full.empty:
+        return kept, []
+    return pd.concat([kept, full], ignore_index=True), sorted(full["ticker"].unique())
+
+
+def delete_ticker_history(con, tickers):
+    """
+    Delete every stored price, metric and correlation row for the given tickers.
+
+    Args:
+        con (duckdb.DuckDBPyConnection): DuckDB connection object.
+        tickers (list): Ticker symbols to delete.
+    """
+    params = {"tickers": list(tickers)}
+    con.execute("DELETE FROM raw_prices WHERE list_contains($tickers, ticker);", params)
+    con.execute("DELETE FROM daily_metrics WHERE list_contains($tickers, ticker);", params)
+    con.execute(
+        """
+        DELETE FROM corr_30d
+        WHERE list_contains($tickers, ticker_a) OR list_contains($tickers, ticker_b);
+    """,
+        params,
+    )
+
+
+def earliest_price_dates(con):
+    """
+    Return the oldest stored raw_prices date per ticker.
+
+    Args:
+        con (duckdb.DuckDBPyConnection): DuckDB connection object.
+
+    Returns:
+        dict: Mapping of ticker to its earliest stored date.
+    """
+    return dict(
+        con.execute("SELECT ticker, min(date) FROM raw_prices GROUP BY ticker").fetchall()
+    )
+
+
+def latest_price_dates(con):
+    """
+    Return the most recent stored raw_prices date per ticker.
+
+    Args:
+        con (duckdb.DuckDBPyConnection): DuckDB connection object.
+
+    Returns:
+        dict: Mapping of ticker to its latest stored date.
+    """
+    return dict(
+        con.execute("SELECT ticker, max(date) FROM raw_prices GROUP BY ticker").fetchall()
+    )
 
 
 def init_db(con):
@@ -81,8 +239,8 @@ def init_db(con):
         CREATE TABLE IF NOT EXISTS raw_prices (
             date DATE,
             ticker VARCHAR,
-            open DOUBLE, high DOUBLE, low DOUBLE, close DOUBLE,
-            volume DOUBLE,
+            open REAL, high REAL, low REAL, close REAL,
+            volume BIGINT,
             PRIMARY KEY (date, ticker)
         );
     """
@@ -92,10 +250,10 @@ def init_db(con):
         CREATE TABLE IF NOT EXISTS daily_metrics (
             date DATE,
             ticker VARCHAR,
-            return_1d DOUBLE,
-            ma_7 DOUBLE, ma_30 DOUBLE,
-            vol_7 DOUBLE, vol_30 DOUBLE,
-            rsi DOUBLE,
+            return_1d REAL,
+            ma_7 REAL, ma_30 REAL,
+            vol_7 REAL, vol_30 REAL,
+            rsi REAL,
             PRIMARY KEY (date, ticker)
         );
     """
@@ -113,116 +271,234 @@ def init_db(con):
     )
 
 
+def _register_prices(con, prices):
+    """Register prices with DuckDB as the prices_df view, in primary-key order."""
+    # this makes the price table we obtained from yfinance
+    # usable within duckdb SQL commands
+    # so this says register prices as a table in duckdb.
+    # DuckDB scans Arrow buffers without copying; the date column is cast to
+    # date32 up front so it lands in the DATE column without a conversion
+    table = pa.Table.from_pandas(prices, preserve_index=False)
+    table = table.set_column(
+        table.schema.get_field_index("date"), "date", table["date"].cast(pa.date32())
+    )
+    # arrive in primary-key order: INSERT OR REPLACE against the (date, ticker)
+    # index is far cheaper on sorted keys than on per-ticker runs
+    table = table.sort_by([("date", "ascending"), ("ticker", "ascending")])
+    con.register("prices_df", table)
+
+
+def revised_closes(con, prices):
+    """
+    Return the fetched rows whose close differs from the one already stored.
+
+    These are the refetched overlap days (see fetch_prices). yfinance prices
+    are split- and dividend-adjusted, so a changed close there usually means
+    the provider re-adjusted the ticker's whole history, which upserting the
+    new rows alone would not repair.
+
+    Args:
+        con (duckdb.DuckDBPyConnection): DuckDB connection object.
+        prices (pd.DataFrame): DataFrame of fetched daily prices.
+
+    Returns:
+        pd.DataFrame: date, ticker, stored_close and fetched_close of each changed row.
+    """
+    if prices.empty:
+        return pd.DataFrame(columns=["date", "ticker", "stored_close", "fetched_close"])
+
+    _register_prices(con, prices)
+    # compare both sides at REAL precision, so neither float64 input nor a
+    # table created while close was still DOUBLE is flagged just for rounding
+    return con.execute(
+        """
+        SELECT p.date, p.ticker, r.close::REAL AS stored_close, p.close::REAL AS fetched_close
+        FROM prices_df p
+        JOIN raw_prices r ON r.date = p.date AND r.ticker = p.ticker
+        WHERE p.close::REAL IS DISTINCT FROM r.close::REAL
+        ORDER BY p.ticker, p.date;
+    """
+    ).df()
+
+
 def upsert_raw_prices(con, prices):
     """
-    Upsert daily prices into the raw_prices table.
+    Upsert daily prices into the raw_prices table, skipping rows that are
+    already stored unchanged.
 
     Args:
         con (duckdb.DuckDBPyConnection): DuckDB connection object.
         df (pd.DataFrame): DataFrame containing daily prices to upsert.
+
+    Returns:
+        int: Number of new or changed rows written.
     """
     if prices.empty:
-        return
+        return 0
 
-    # this makes the price table we obtained from yfinance
-    # usable within duckdb SQL commands
-    # so this says register prices as a table in duckdb
-    con.register("prices_df", prices)
-    # this inserts everything from the prices_df table
-    # into the raw_prices table, replacing any existing rows
-    con.execute(
+    _register_prices(con, prices)
+    # this inserts the rows of prices_df into the raw_prices table, replacing
+    # any existing rows; rows identical to what is already stored (the
+    # refetched last day, usually) are dropped first so they don't churn the index.
+    # A stored row that changed is overwritten here; check revised_closes before
+    # upserting to tell a provider re-adjustment from new data
+    inserted = con.execute(
         """
         INSERT OR REPLACE INTO raw_prices
-        SELECT * FROM prices_df;
+        SELECT date, ticker, open, high, low, close, volume FROM prices_df
+        EXCEPT
+        SELECT date, ticker, open, high, low, close, volume FROM raw_prices
+        WHERE date >= (SELECT min(date) FROM prices_df);
     """
-    )
-    output_path = "data/raw_prices_export.csv"
-    safe_path = output_path.replace("'", "''")  # escape quotes just in case
-    con.execute(f"""
-        COPY (
-            SELECT *
-            FROM raw_prices
-            ORDER BY date DESC, ticker
-        ) TO '{safe_path}' WITH (HEADER, DELIMITER ',');
-    """)
-    return len(prices)
+    ).fetchone()
+    return inserted[0] if inserted else 0
 
 
-def compute_tech(df):
+def upsert_metrics(con, since=None):
     """
-    Compute technical indicators for the given DataFrame.
-    Args:
-        df (pd.DataFrame): DataFrame containing daily prices with columns:
-            date, ticker, open, high, low, close, volume.
-            Returns:
-        pd.DataFrame: DataFrame with additional columns for technical indicators:
-            return_1d, ma_7, ma_30, vol_7, vol
-    """
-    df = df.copy()
-    # The rolling standard deviation measures the variability (or volatility)
-    # of a fixed number of consecutive data points in a time series.
-    # It quantifies how much the values deviate from their rolling average.
-    df["return_1d"] = df.groupby("ticker")["close"].pct_change()
-    df["ma_7"] = df.groupby("ticker")["close"].transform(lambda s: s.rolling(7).mean())
-    df["ma_30"] = df.groupby("ticker")["close"].transform(
-        lambda s: s.rolling(30).mean()
-    )
-    df["vol_7"] = df.groupby("ticker")["return_1d"].transform(
-        lambda s: s.rolling(7).std()
-    )
-    df["vol_30"] = df.groupby("ticker")["return_1d"].transform(
-        lambda s: s.rolling(30).std()
-    )
+    Compute technical indicators from raw_prices and upsert them into daily_metrics.
 
-    # Calulcate RSI: Relative Strength Index
-    def compute_rsi(series, n=14):
-        # has a default value of 1 and sees difference with previous row
-        delta = series.diff()
-        # .where is used to replace negative values with 0
-        gain = delta.where(delta > 0, 0)
-        loss = -delta.where(delta < 0, 0)
-
-        avg_gain = gain.ewm(alpha=1 / n, min_periods=n, adjust=False).mean()
-        avg_loss = loss.ewm(alpha=1 / n, min_periods=n, adjust=False).mean()
-
-        rs = avg_gain / avg_loss.replace(0, pd.NA)
-        rsi = 100 - (100 / (1 + rs))
-        return rsi
-
-    df["rsi"] = (
-        df.groupby("ticker")["close"]
-        .apply(lambda group: compute_rsi(group, 14))
-        .reset_index(level=0, drop=True)  # Align the index with the original DataFrame
-    )
-    return df
+    Every indicator is a per-ticker window function, so the computation runs
+    entirely inside DuckDB without pulling prices back into pandas.
 
+    Args:
+        con (duckdb.DuckDBPyConnection): DuckDB connection object.
+        since (datetime.date, optional): Only write rows dated on or after this
+            day. Indicators are still computed over the full price history, so
+            the written values match a full rebuild.
+    """
+    # Wilder RSI is an EWM with alpha = 1/n seeded at 0 on each ticker's first
+    # row, which unrolls to avg_k = alpha * sum_{i<=k} x_i * (1 - alpha)^(k - i).
+    # RSI only needs avg_gain / avg_loss, so both sums can be weighted relative
+    # to the newest row instead: weights stay <= 1 and the common factor
+    # cancels. Rows whose weights have decayed below ~1e-250 can no longer be
+    # resolved in double precision; their RSI is left NULL (thousands of rows
+    # back, ~7,800 at n = 14), while the other columns are still written.
+    inserted = con.execute(
+        """
+        INSERT OR REPLACE INTO daily_metrics
+        WITH base AS (
+            -- prices are stored as REAL; widen before any arithmetic so the
+            -- indicators only pay float32 rounding once, on the way out
+            SELECT
+                date,
+                ticker,
+                close,
+                close / lag(close) OVER w - 1 AS return_1d,
+                coalesce(close - lag(close) OVER w, 0) AS delta,
+                row_number() OVER w - 1 AS k,
+                count(*) OVER (PARTITION BY ticker) - 1 AS last_k
+            FROM (SELECT date, ticker, close::DOUBLE AS close FROM raw_prices)
+            WINDOW w AS (PARTITION BY ticker ORDER BY date)
+        ),
+        windowed AS (
+            SELECT
+                date,
+                ticker,
+                return_1d,
+                CASE WHEN count(close) OVER w7 = 7 THEN avg(close) OVER w7 END AS ma_7,
+                CASE WHEN count(close) OVER w30 = 30 THEN avg(close) OVER w30 END AS ma_30,
+                CASE WHEN count(return_1d) OVER w7 = 7
+                    THEN stddev_samp(return_1d) OVER w7 END AS vol_7,
+                CASE WHEN count(return_1d) OVER w30 = 30
+                    THEN stddev_samp(return_1d) OVER w30 END AS vol_30,
+                k,
+                pow(1 - $alpha, last_k - k) AS weight,
+                sum(greatest(delta, 0) * pow(1 - $alpha, last_k - k)) OVER w AS gain_sum,
+                sum(greatest(-delta, 0) * pow(1 - $alpha, last_k - k)) OVER w AS loss_sum
+            FROM base
+            WINDOW
+                w AS (PARTITION BY ticker ORDER BY date),
+                w7 AS (PARTITION BY ticker ORDER BY date ROWS BETWEEN 6 PRECEDING AND CURRENT ROW),
+                w30 AS (PARTITION BY ticker ORDER BY date ROWS BETWEEN 29 PRECEDING AND CURRENT ROW)
+        )
+        SELECT
+            date,
+            ticker,
+            return_1d,
+            ma_7, ma_30,
+            vol_7, vol_30,
+            CASE WHEN k >= $period - 1 AND weight > 1e-250
+                THEN 100 - 100 / (1 + gain_sum / nullif(loss_sum, 0)) END AS rsi
+        FROM windowed
+        WHERE $since IS NULL OR date >= $since
+        ORDER BY date, ticker;
+    """,
+        {"alpha": 1 / RSI_PERIOD, "period": RSI_PERIOD, "since": since},
+    ).fetchone()
+    return inserted[0] if inserted else 0
 
-def upsert_metrics(con, metrics):
+
+def upsert_corr(con, since=None):
     """
-    Upsert daily metrics into the daily_metrics table.
+    Upsert rolling 30-day return correlations for every ticker pair into corr_30d.
+
+    The whole computation runs inside DuckDB: daily_metrics is self-joined on
+    date and a windowed corr() is evaluated per (ticker_a, ticker_b) pair.
 
     Args:
         con (duckdb.DuckDBPyConnection): DuckDB connection object.
-        df (pd.DataFrame): DataFrame containing daily metrics to upsert.
+        since (datetime.date, optional): Only write rows dated on or after this
+            day; earlier windows still feed the rolling correlation.
     """
-    if metrics.empty:
-        return 0
+    # ticker_a < ticker_b keeps one row per unordered pair and drops self-pairs;
+    # windows with fewer than 15 paired returns are too noisy to keep
+    inserted = con.execute(
+        """
+        INSERT OR REPLACE INTO corr_30d
+        SELECT
+            a.date,
+            a.ticker AS ticker_a,
+            b.ticker AS ticker_b,
+            corr(a.return_1d, b.return_1d) OVER w AS corr_30d
+        FROM daily_metrics a
+        JOIN daily_metrics b ON a.date = b.date
+        WHERE a.ticker < b.ticker
+        WINDOW w AS (
+            PARTITION BY a.ticker, b.ticker
+            ORDER BY a.date
+            ROWS BETWEEN 29 PRECEDING AND CURRENT ROW
+        )
+        QUALIFY regr_count(a.return_1d, b.return_1d) OVER w >= 15
+            AND ($since IS NULL OR a.date >= $since);
+    """,
+        {"since": since},
+    ).fetchone()
+    return inserted[0] if inserted else 0
+
+
+def export_snapshots(con):
+    """
+    Write the raw price and recent metrics exports from the committed tables.
 
-    # Register the DataFrame as a DuckDB table
-    cols = ["date", "ticker", "return_1d", "ma_7", "ma_30", "vol_7", "vol_30", "rsi"]
-    con.register("metrics_df", metrics[cols])
-    con.execute("INSERT OR REPLACE INTO daily_metrics SELECT * FROM metrics_df;")
+    Run after the upserts commit, so the files never reflect a rolled-back run
+    and every export comes from the same snapshot.
 
+    Args:
+        con (duckdb.DuckDBPyConnection): DuckDB connection object.
+    """
     con.execute(f"""
         COPY (
             SELECT *
-            FROM daily_metrics
-            WHERE date >= current_date - INTERVAL 120 DAY
+            FROM raw_prices
             ORDER BY date DESC, ticker
-        ) TO '{EXPORT_CSV}' WITH (HEADER, DELIMITER ',');
+        ) TO '{EXPORT_RAW_CSV}' WITH (HEADER, DELIMITER ',');
     """)
 
-    return len(metrics)
+    recent_metrics = """
+        SELECT *
+        FROM daily_metrics
+        WHERE date >= current_date - INTERVAL 120 DAY
+        ORDER BY date DESC, ticker
+    """
+    # the CSV is what gets attached to the report email; charts read the
+    # Parquet copy, which keeps column types and skips text parsing
+    con.execute(f"""
+        COPY ({recent_metrics}) TO '{EXPORT_CSV}' WITH (HEADER, DELIMITER ',');
+    """)
+    con.execute(f"""
+        COPY ({recent_metrics}) TO '{EXPORT_PARQUET}' (FORMAT PARQUET, COMPRESSION ZSTD);
+    """)
 
 
 # Add this to the end of your existing pipeline.py file
@@ -235,15 +511,17 @@ def generate_charts():
         import os
         sys.path.append(os.path.dirname(os.path.abspath(__file__)))
         
-        from chart_generator import generate_charts_from_csv
-        
-        # Create charts directory
-        os.makedirs("data/charts", exist_ok=True)
+        from chart_generator import generate_email_charts
         
-        # Generate charts from the CSV we just created
-        if os.path.exists(EXPORT_CSV):
+        # Generate charts from the export we just wrote; the Parquet copy skips
+        # CSV parsing. Charts render in parallel worker processes. The manifest
+        # left in data/charts lets send_report_email reuse them when it is run
+        # against the same export, including from the downloaded CI artifacts.
+        source = EXPORT_PARQUET if os.path.exists(EXPORT_PARQUET) else EXPORT_CSV
+        if os.path.exists(source):
             print("📈 Generating visualization charts...")
-            chart_paths = generate_charts_from_csv(EXPORT_CSV, "data/charts")
+            charts = generate_email_charts(source, max_charts=0, output_dir="data/charts")
+            chart_paths = [c["image_path"] for c in charts.values()]
             
             print(f"✅ Generated {len(chart_paths)} charts:")
             for chart_path in chart_paths:
@@ -251,7 +529,7 @@ def generate_charts():
             
             return chart_paths
         else:
-            print(f"❌ CSV file not found: {EXPORT_CSV}")
+            print(f"❌ Metrics export not found: {source}")
             return []
             
     except ImportError as e:
@@ -263,17 +541,35 @@ def generate_charts():
 
 # Modify your main function to include chart generation
 def main():
-    print('getting prices...')
-    prices = fetch_prices(TICKERS, LOOKBACK_DAYS)
-    print(prices.head)
-    print('fetching prices complete, computing metrics...')
-    metrics = compute_tech(prices)
     con = duckdb.connect(DB_PATH)
     init_db(con)
-    print('upserting metrics...')
-    upsert_metrics(con, metrics)
-    print('upserting raw prices...')
-    upsert_raw_prices(con, prices)
+    print('getting prices...')
+    prices, replaced = fetch_updates(con, TICKERS, LOOKBACK_DAYS)
+    print(prices.head)
+    # one transaction for all three upserts: a single commit to the WAL, and a
+    # failed step leaves the previous run's tables intact
+    con.begin()
+    try:
+        if replaced:
+            print(f"replacing stored history for {', '.join(replaced)}...")
+            delete_ticker_history(con, replaced)
+        print('upserting raw prices...')
+        upsert_raw_prices(con, prices)
+        if prices.empty:
+            print('no new prices, metrics unchanged')
+        else:
+            # only days from the earliest fetched bar onwards can have changed
+            since = prices["date"].min()
+            print('fetching prices complete, computing metrics...')
+            upsert_metrics(con, since)
+            print('computing 30d correlations...')
+            upsert_corr(con, since)
+        con.commit()
+    except Exception:
+        con.rollback()
+        raise
+    print('exporting snapshots...')
+    export_snapshots(con)
     
     # Generate charts after data processing
     chart_paths = generate_charts()
@@ -5,10 +5,12 @@ laid out in a grid. Called from GitHub Actions workflow.
 """
 import os
 import sys
+import html
 import inspect
 from datetime import datetime
-from email_handler import send_email
-from chart_generator import generate_email_charts
+from functools import lru_cache
+from email_handler import attachment_filename, send_email
+from chart_generator import generate_email_charts, load_metrics, metrics_table_html
 import pandas as pd
 from typing import Dict, List
 
@@ -32,32 +34,44 @@ def main():
         print(f"Error: Missing required environment variables: {', '.join(missing_vars)}")
         return 1
 
-    # Verify CSV attachment exists
-    if not os.path.exists(attachment_path):
+    # Verify CSV attachment exists; the stat result also gives its size below
+    try:
+        csv_stat = os.stat(attachment_path)
+    except FileNotFoundError:
         print(f"Error: CSV file not found: {attachment_path}")
         return 1
 
+    # Prefer the typed Parquet export written next to the CSV, if present; it
+    # is read for the summary and the charts instead of parsing the CSV
+    parquet_path = os.path.splitext(attachment_path)[0] + ".parquet"
+    metrics_source = parquet_path if os.path.exists(parquet_path) else attachment_path
+
     # Get basic CSV info for summary
     try:
-        df = pd.read_csv(attachment_path)
+        df = load_metrics(metrics_source)
         num_tickers = len(df['ticker'].unique()) if 'ticker' in df.columns else 0
         num_records = len(df)
         date_range = ""
         if 'date' in df.columns:
-            df['date'] = pd.to_datetime(df['date'])
-            start_date = df['date'].min().strftime('%Y-%m-%d')
-            end_date = df['date'].max().strftime('%Y-%m-%d')
+            # load_metrics already returns typed dates, so no re-parse is needed
+            start_date = pd.Timestamp(df['date'].min()).strftime('%Y-%m-%d')
+            end_date = pd.Timestamp(df['date'].max()).strftime('%Y-%m-%d')
             date_range = f"{start_date} to {end_date}"
+        metrics_html = generate_metrics_html(df)
     except Exception as e:
         print(f"Warning: Could not read CSV for summary: {e}")
         num_tickers = 0
         num_records = 0
         date_range = "Unknown"
+        metrics_html = ""
 
-    # Generate charts (JPEG on disk)
+    # Generate charts (JPEG on disk). The pipeline renders into a charts/
+    # directory next to its exports, which CI downloads next to the attachment;
+    # when its manifest matches this export the charts are reused, not redrawn
+    charts_dir = os.path.join(os.path.dirname(attachment_path), "charts")
     try:
         print("🎨 Generating charts for email embedding...")
-        embedded_charts: Dict[str, Dict[str, str]] = generate_email_charts(attachment_path)
+        embedded_charts: Dict[str, Dict[str, str]] = generate_email_charts(metrics_source, output_dir=charts_dir)
         print(f"✅ Generated {len(embedded_charts)} charts for embedding")
     except Exception as e:
         print(f"⚠️  Warning: Could not generate charts: {e}")
@@ -71,7 +85,8 @@ def main():
         img_path = cdata.get("image_path")
         if not img_path or not os.path.exists(img_path):
             continue
-        cid = f"chart{i}@etl"
+        # chart keys are stable, so the CIDs stay the same from one report to the next
+        cid = f"{ckey}@etl"
         inline_images.append({"cid": cid, "path": img_path})
         gallery_items.append({
             "cid": cid,
@@ -80,8 +95,12 @@ def main():
         })
 
     # File info for email content
-    csv_size = os.path.getsize(attachment_path)
+    csv_size = csv_stat.st_size
     csv_size_mb = csv_size / (1024 * 1024)
+    # send_email gzips a large CSV; name the file that actually gets attached
+    csv_name = attachment_filename(attachment_path, csv_size)
+    csv_gzipped = csv_name != os.path.basename(attachment_path)
+    csv_info = f"{csv_name} ({csv_size_mb:.2f} MB{' uncompressed' if csv_gzipped else ''})"
 
     # Email meta
     current_date = datetime.now().strftime("%Y-%m-%d")
@@ -120,7 +139,7 @@ Your financial data pipeline has completed successfully!
 • Tickers Analyzed: {num_tickers} assets
 • Total Records: {num_records:,} data points
 • Date Range: {date_range}
-• CSV File: {os.path.basename(attachment_path)} ({csv_size_mb:.2f} MB)
+• CSV File: {csv_info}
 • Charts: {len(gallery_items)} visualizations
 
 📈 ANALYSIS OVERVIEW
@@ -139,9 +158,10 @@ Financial ETL Bot
         num_records=num_records,
         csv_size_mb=csv_size_mb,
         embedded_count=len(gallery_items),
-        attachment_path=attachment_path,
+        attachment_name=csv_name,
         date_range=date_range,
-        charts_html=charts_html
+        charts_html=charts_html,
+        metrics_html=metrics_html
     )
 
     # Build attachments list
@@ -192,9 +212,10 @@ Financial ETL Bot
                 num_records=num_records,
                 csv_size_mb=csv_size_mb,
                 embedded_count=len(gallery_items),
-                attachment_path=attachment_path,
+                attachment_name=csv_name,
                 date_range=date_range,
-                charts_html=body_html_fallback
+                charts_html=body_html_fallback,
+                metrics_html=metrics_html
             )
             message_id = send_email(
                 sender=sender_email,
@@ -218,6 +239,7 @@ Financial ETL Bot
         return 1
 
 
+@lru_cache(maxsize=1)
 def _send_email_supports_inline_images() -> bool:
     """Detect whether send_email(sender, ..., inline_images=...) is supported."""
     try:
@@ -234,9 +256,10 @@ def build_full_html(
     num_records: int,
     csv_size_mb: float,
     embedded_count: int,
-    attachment_path: str,
+    attachment_name: str,
     date_range: str,
-    charts_html: str
+    charts_html: str,
+    metrics_html: str = ""
 ) -> str:
     """Assemble the complete HTML using your existing theme + charts_html injected."""
     return f"""
@@ -303,12 +326,14 @@ body {{
           </tr>
         </table>
         <div style="font-size:13px; color:#374151; margin-top:10px;">
-          <div><strong>📄 Data File:</strong> {os.path.basename(attachment_path)}</div>
+          <div><strong>📄 Data File:</strong> {_escape_html(attachment_name)}</div>
           <div><strong>📅 Date Range:</strong> {date_range}</div>
           <div><strong>📈 Analysis:</strong> Moving averages, RSI, volatility, daily returns</div>
         </div>
       </div>
 
+      {metrics_html}
+
       {charts_html}
 
       <div style="background:#f0f9ff; border-left:4px solid #0ea5e9; border-radius:8px; padding:12px 14px; margin:16px 0; font-size:13px; color:#0c4a6e;">
@@ -353,6 +378,19 @@ def generate_charts_grid_html(items):
     return f'<table class="chart-grid" role="presentation" cellpadding="0" cellspacing="0" width="100%">{"".join(rows)}</table>'
 
 
+def generate_metrics_html(df) -> str:
+    """Latest metrics per ticker as an HTML table card (replaces the rendered table chart)."""
+    if df.empty or not {'date', 'ticker'}.issubset(df.columns):
+        return ""
+    return f"""
+<div class="summary-card">
+  <h2 style="margin:0 0 10px 0; font-size:18px;">Current Metrics</h2>
+  <div style="font-size:12px; color:#64748b; margin:0 0 8px 0;">Latest values for all tracked metrics. RSI cells color-coded.</div>
+  {metrics_table_html(df)}
+</div>
+""".strip()
+
+
 def generate_charts_fallback_html(paths: List[str]) -> str:
     if not paths:
         return ""
@@ -380,14 +418,8 @@ def generate_charts_text(charts_dict: Dict[str, Dict[str, str]]) -> str:
 
 
 def _escape_html(s: str) -> str:
-    return (
-        str(s)
-        .replace("&", "&amp;")
-        .replace("<", "&lt;")
-        .replace(">", "&gt;")
-        .replace('"', "&quot;")
-        .replace("'", "&#39;")
-    )
+    # one C-level pass; escapes & < > " and ' (as &#x27;)
+    return html.escape(str(s), quote=True)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+import src.chart_generator as chart_generator
+from src.chart_generator import ChartGenerator, load_metrics, metrics_table_html
+
+
+def _metrics(tickers=("AAA", "BBB"), n=7, seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range("2025-01-01", periods=n)
+    frames = []
+    for t in tickers:
+        frames.append(pd.DataFrame({
+            "date": dates, "ticker": t,
+            "return_1d": rng.normal(0, 0.01, n),
+            "ma_7": 100 + rng.normal(0, 1, n), "ma_30": np.nan,
+            "vol_7": rng.uniform(0.01, 0.02, n), "vol_30": np.nan,
+            "rsi": rng.uniform(20, 80, n),
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+
+def test_load_metrics_reads_empty_csv_columns_as_float(tmp_path):
+    # under 30 days of history leaves ma_30 and vol_30 empty in the export
+    path = tmp_path / "daily_metrics.csv"
+    _metrics().to_csv(path, index=False)
+
+    df = load_metrics(str(path))
+    assert df["ma_30"].dtype == "float64"
+    assert df["vol_30"].dtype == "float64"
+    assert df["ma_30"].isna().all()
+    charts = ChartGenerator(str(tmp_path / "charts")).create_market_overview(df)
+    assert set(charts) == {"market_overview"}
+
+
+def test_generate_email_charts_reuses_manifest(tmp_path, monkeypatch):
+    # one ticker, 7 rows: trend analysis renders nothing, which is not a failure
+    path = tmp_path / "daily_metrics.csv"
+    _metrics(tickers=("AAA",)).to_csv(path, index=False)
+    out = tmp_path / "charts"
+
+    first = chart_generator.generate_email_charts(str(path), max_charts=0, output_dir=str(out))
+    assert set(first) == {"market_overview", "performance_summary"}
+    assert len(list(out.glob("manifest_*.json"))) == 1
+
+    # a hit renders nothing: it returns the recorded images even if rendering would fail
+    monkeypatch.setattr(chart_generator, "load_metrics", None)
+    second = chart_generator.generate_email_charts(str(path), max_charts=0, output_dir=str(out))
+    assert second == first
+
+
+def test_generate_email_charts_skips_manifest_when_a_chart_fails(tmp_path, monkeypatch):
+    path = tmp_path / "daily_metrics.csv"
+    _metrics().to_csv(path, index=False)
+    out = tmp_path / "charts"
+    monkeypatch.setattr(chart_generator, "EMAIL_CHARTS", chart_generator.EMAIL_CHARTS + ("create_missing",))
+
+    charts = chart_generator.generate_email_charts(str(path), max_charts=0, output_dir=str(out))
+    assert "market_overview" in charts
+    assert not list(out.glob("manifest_*.json"))
+
+
+def test_metrics_table_html_formats_latest_rows():
+    df = pd.DataFrame({
+        "date": pd.to_datetime(["2025-01-01", "2025-01-02", "2025-01-02", "2025-01-02"]),
+        "ticker": ["AAA", "AAA", "BBB", "<C&D>"],
+        "ma_7": [1.0, 101.5, 50.0, 20.0],
+        "ma_30": [1.0, 99.0, 49.0, np.nan],
+        "rsi": [50.0, 75.0, 25.0, np.nan],
+        "return_1d": [0.0, 0.0123, -0.01, 0.0],
+        "vol_30": [0.0, 0.02, 0.03, np.nan],
+    })
+    rows = metrics_table_html(df).split("<tr>")[2:]
+    assert len(rows) == 3
+
+    # latest row per ticker, RSI cell shaded by band
+    assert "$101.50" in rows[1] and "1.23%" in rows[1]
+    assert "background:#ffcdd2;\">75.0<" in rows[1]
+    assert "background:#c8e6c9;\">25.0<" in rows[2]
+    # missing values read N/A, and tickers are escaped
+    assert "&lt;C&amp;D&gt;" in rows[0] and "<C&D>" not in rows[0]
+    assert rows[0].count(">N/A<") == 3
+    assert "background:#ffffff;\">N/A<" in rows[0]
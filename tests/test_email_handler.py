@@ -0,0 +1,30 @@
+import gzip
+import pytest
+from src.email_handler import GZIP_ATTACHMENT_MIN_BYTES, attachment_filename, build_message
+
+
+@pytest.mark.parametrize("size, gzipped", [
+    (GZIP_ATTACHMENT_MIN_BYTES, False),
+    (GZIP_ATTACHMENT_MIN_BYTES + 1, True),
+])
+def test_build_message_gzips_large_text_attachments(tmp_path, size, gzipped):
+    row = b"2025-01-02,AAA,101.25,0.0123\n"
+    data = (row * (size // len(row) + 1))[:size]
+    path = tmp_path / "daily_metrics.csv"
+    path.write_bytes(data)
+
+    msg = build_message("a@example.com", "b@example.com", "report", "body",
+                        attachment_paths=[str(path)])
+    (part,) = [p for p in msg.walk() if p.get_content_disposition() == "attachment"]
+    payload = part.get_payload(decode=True)
+
+    # the report body names the attachment with attachment_filename
+    assert part.get_filename() == attachment_filename(str(path), size)
+    if gzipped:
+        assert part.get_content_type() == "application/gzip"
+        assert part.get_filename() == "daily_metrics.csv.gz"
+        assert gzip.decompress(payload) == data
+    else:
+        assert part.get_content_type() == "text/csv"
+        assert part.get_filename() == "daily_metrics.csv"
+        assert payload == data
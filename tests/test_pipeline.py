@@ -1,6 +1,45 @@
 import os
+import duckdb
+import numpy as np
+import pandas as pd
 import pytest
-from src.pipeline import fetch_prices
+import src.pipeline as pipeline
+from src.pipeline import (
+    fetch_prices, init_db, upsert_raw_prices, upsert_metrics, upsert_corr, export_snapshots,
+    fetch_updates, delete_ticker_history, EXPORT_CSV, EXPORT_PARQUET,
+)
+
+
+def _synthetic_prices(tickers=("AAA", "BBB", "CCC"), n=120, seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range("2025-01-01", periods=n).date
+    frames = []
+    for t in tickers:
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+        frames.append(pd.DataFrame({
+            "date": dates, "ticker": t,
+            "open": close, "high": close * 1.01, "low": close * 0.99, "close": close,
+            "volume": rng.integers(100_000, 1_000_000, n).astype(float),
+        }))
+    return pd.concat(frames, ignore_index=True).sort_values(["ticker", "date"])
+
+
+def _yf_history(prices):
+    """Shape one ticker's long-format prices like yfinance's Ticker.history output."""
+    index = pd.DatetimeIndex(pd.to_datetime(prices["date"]), name="Date").tz_localize("America/New_York")
+    out = prices.set_index(index)[["open", "high", "low", "close", "volume"]].rename(columns=str.title)
+    out["Dividends"] = 0.0
+    out["Stock Splits"] = 0.0
+    return out
+
+
+@pytest.fixture
+def con():
+    con = duckdb.connect()
+    init_db(con)
+    upsert_raw_prices(con, _synthetic_prices())
+    return con
+
 
 def test_fetch_prices_returns_data():
     tickers = os.getenv("TICKERS", "AAPL,MSFT,TSLA").split(",")
@@ -8,4 +47,125 @@ def test_fetch_prices_returns_data():
     df = fetch_prices(tickers, lookback)
     assert df is not None
     assert len(df) > 0
-    
+
+
+def test_upsert_metrics_matches_pandas_indicators(con):
+    assert upsert_metrics(con) > 0
+    got = con.execute("SELECT * FROM daily_metrics ORDER BY ticker, date").df()
+
+    # reference computed from the closes as stored (REAL), in float64
+    prices = con.execute("SELECT ticker, close::DOUBLE AS close FROM raw_prices ORDER BY ticker, date").df()
+    close = prices.groupby("ticker")["close"]
+    delta = close.diff()
+    gain = delta.where(delta > 0, 0).groupby(prices["ticker"])
+    loss = (-delta.where(delta < 0, 0)).groupby(prices["ticker"])
+    ewm = dict(alpha=1 / 14, min_periods=14, adjust=False)
+    avg_gain = gain.transform(lambda s: s.ewm(**ewm).mean())
+    avg_loss = loss.transform(lambda s: s.ewm(**ewm).mean())
+    returns = close.pct_change()
+    expected = {
+        "return_1d": returns,
+        "ma_7": close.transform(lambda s: s.rolling(7).mean()),
+        "ma_30": close.transform(lambda s: s.rolling(30).mean()),
+        "vol_7": returns.groupby(prices["ticker"]).transform(lambda s: s.rolling(7).std()),
+        "vol_30": returns.groupby(prices["ticker"]).transform(lambda s: s.rolling(30).std()),
+        "rsi": 100 - 100 / (1 + avg_gain / avg_loss.replace(0, np.nan)),
+    }
+    for col, values in expected.items():
+        np.testing.assert_allclose(got[col].to_numpy(dtype=float), values.to_numpy(dtype=float), rtol=1e-6)
+
+
+def test_upsert_metrics_since_only_rewrites_recent_rows(con):
+    upsert_metrics(con)
+    full = con.execute("SELECT * FROM daily_metrics ORDER BY ticker, date").df()
+    since = full["date"].iloc[-10]
+
+    con.execute("DELETE FROM daily_metrics")
+    assert upsert_metrics(con, since) == (full["date"] >= since).sum()
+    got = con.execute("SELECT * FROM daily_metrics ORDER BY ticker, date").df()
+    expected = full[full["date"] >= since].reset_index(drop=True)
+    pd.testing.assert_frame_equal(got, expected)
+
+
+def test_upsert_corr_matches_pandas_rolling_corr(con):
+    upsert_metrics(con)
+    assert upsert_corr(con) > 0
+
+    got = con.execute(
+        "SELECT date, corr_30d FROM corr_30d WHERE ticker_a = 'AAA' AND ticker_b = 'BBB' ORDER BY date"
+    ).df()
+    metrics = con.execute("SELECT date, ticker, return_1d FROM daily_metrics").df()
+    returns = metrics.pivot(index="date", columns="ticker", values="return_1d")
+    expected = returns["AAA"].rolling(30, min_periods=15).corr(returns["BBB"]).dropna()
+    assert len(got) == len(expected)
+    np.testing.assert_allclose(got["corr_30d"].to_numpy(), expected.to_numpy())
+
+
+def test_export_snapshots_writes_recent_metrics(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("data")
+    con = duckdb.connect()
+    init_db(con)
+    # shift the synthetic history to end today so it falls in the export window
+    prices = _synthetic_prices()
+    offset = pd.Timestamp.today().normalize() - pd.Timestamp(prices["date"].max())
+    prices["date"] = (pd.to_datetime(prices["date"]) + offset).dt.date
+    upsert_raw_prices(con, prices)
+    upsert_metrics(con)
+    export_snapshots(con)
+
+    csv = pd.read_csv(EXPORT_CSV)
+    parquet = pd.read_parquet(EXPORT_PARQUET)
+    assert len(csv) > 0
+    assert len(csv) == len(parquet)
+    assert list(csv.columns) == list(parquet.columns)
+
+
+def test_fetch_updates_replaces_history_after_split(monkeypatch):
+    prices = _synthetic_prices()
+    offset = pd.Timestamp.today().normalize() - pd.Timestamp(prices["date"].max())
+    prices["date"] = (pd.to_datetime(prices["date"]) + offset).dt.date
+    dates = sorted(prices["date"].unique())
+    stored_until, split_day = dates[-10], dates[-5]
+
+    # the provider back-adjusts AAA for a 10:1 split after its history was stored
+    provider = {t: _yf_history(g) for t, g in prices.groupby("ticker")}
+    provider["AAA"][["Open", "High", "Low", "Close"]] /= 10
+    provider["AAA"].loc[provider["AAA"].index.date == split_day, "Stock Splits"] = 10.0
+
+    class FakeTicker:
+        def __init__(self, ticker):
+            self.ticker = ticker
+
+        def history(self, start, **kwargs):
+            df = provider[self.ticker]
+            return df[df.index.date >= pd.Timestamp(start).date()]
+
+    monkeypatch.setattr(pipeline.yf, "Ticker", FakeTicker)
+    # the first 40 stored days are older than the lookback window
+    lookback = (pd.Timestamp.today() - pd.Timestamp(dates[40])).days
+
+    con = duckdb.connect()
+    init_db(con)
+    upsert_raw_prices(con, prices[prices["date"] <= stored_until])
+    upsert_metrics(con)
+    new_prices, replaced = fetch_updates(con, ["AAA", "BBB", "CCC"], lookback)
+    assert replaced == ["AAA"]
+    delete_ticker_history(con, replaced)
+    upsert_raw_prices(con, new_prices)
+    upsert_metrics(con, new_prices["date"].min())
+    got = con.execute("SELECT * FROM daily_metrics ORDER BY ticker, date").df()
+
+    # history older than the lookback is replaced, not dropped
+    first_dates = dict(con.execute("SELECT ticker, min(date) FROM raw_prices GROUP BY ticker").fetchall())
+    assert first_dates == {t: dates[0] for t in ("AAA", "BBB", "CCC")}
+
+    # must match a clean build from the provider's current history
+    fresh = duckdb.connect()
+    init_db(fresh)
+    full_lookback = (pd.Timestamp.today() - pd.Timestamp(dates[0])).days
+    upsert_raw_prices(fresh, fetch_prices(["AAA", "BBB", "CCC"], full_lookback))
+    upsert_metrics(fresh)
+    expected = fresh.execute("SELECT * FROM daily_metrics ORDER BY ticker, date").df()
+    pd.testing.assert_frame_equal(got, expected)
+    assert got["return_1d"].abs().max() < 0.5